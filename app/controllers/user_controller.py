@@ -1,7 +1,9 @@
 from fastapi import HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
+import os
 import uuid
 import json
 from ..models import User, UserCreate
@@ -9,6 +11,52 @@ from ..models.enums import UserRole
 from ..services import UserService
 from ..core import settings
 
+# Uploads are streamed to disk in chunks of this size instead of read whole
+_UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Uploads are accepted by extension; the PDF header is only sniffed when there is none
+_ALLOWED_EXTENSIONS = frozenset({'.pdf'})
+# Declared content types that may carry a PDF; anything else is rejected unread
+_ALLOWED_CONTENT_TYPES = frozenset({'application/pdf', 'application/x-pdf', 'application/octet-stream'})
+_NOT_PDF_DETAIL = "Only PDF files are allowed"
+# b"%PDF" as a big-endian integer, compared against the first 4 bytes
+_PDF_MAGIC = 0x25504446
+
+# Profile document slots a user can upload to
+_ALLOWED_TYPES = frozenset({"cv", "certificate", "degree"})
+_INVALID_TYPE_DETAIL = "Invalid file type. Must be one of: cv, certificate, degree"
+
+def _file_too_large() -> HTTPException:
+    """Error for uploads over settings.MAX_FILE_SIZE"""
+    return HTTPException(
+        status_code=400, 
+        detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE // (1024*1024)}MB"
+    )
+
+def _validate_upload(filename: Optional[str], file_type: str, size: Optional[int], content_type: Optional[str] = None) -> str:
+    """Validate upload metadata; return the lowercased extension ("" if none)"""
+    # Validate file type
+    if file_type not in _ALLOWED_TYPES:
+        raise HTTPException(status_code=400, detail=_INVALID_TYPE_DETAIL)
+    
+    # Validate file extension
+    if not filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+        
+    # Compare only the media type; parameters and letter case don't change it
+    if content_type is not None and content_type.split(";", 1)[0].strip().lower() not in _ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail=_NOT_PDF_DETAIL)
+    
+    file_extension = Path(filename).suffix.lower()
+    if file_extension and file_extension not in _ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=_NOT_PDF_DETAIL)
+    
+    # Reject oversized uploads up front when the client declared a size
+    if size is not None and size > settings.MAX_FILE_SIZE:
+        raise _file_too_large()
+    
+    return file_extension
+
 class UserController:
     def __init__(self, user_service: UserService):
         self.user_service = user_service
@@ -62,68 +110,71 @@ class UserController:
     async def upload_file(self, file: UploadFile, file_type: str, user: User) -> dict:
         """Upload file for user"""
         try:
-            # Validate file type
-            valid_file_types = ["cv", "certificate", "degree"]
-            if file_type not in valid_file_types:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Invalid file type. Must be one of: {', '.join(valid_file_types)}"
-                )
-            
-            # Validate file extension
-            if not file.filename:
-                raise HTTPException(status_code=400, detail="No filename provided")
-                
-            file_extension = file.filename.split('.')[-1].lower()
-            if file_extension not in ['pdf']:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Only PDF files are allowed"
-                )
-            
-            # Check file size
-            content = await file.read()
-            if len(content) > settings.MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE // (1024*1024)}MB"
-                )
+            file_extension = _validate_upload(file.filename, file_type, file.size, file.content_type)
+            
+            # Without an extension, accept the file only if its header is a PDF's
+            if not file_extension:
+                header = await file.read(4)
+                await file.seek(0)
+                if int.from_bytes(header, "big") != _PDF_MAGIC:
+                    raise HTTPException(status_code=400, detail=_NOT_PDF_DETAIL)
+                file_extension = ".pdf"
             
             # Create uploads directory if it doesn't exist
-            uploads_dir = settings.UPLOAD_DIR / user.id
-            uploads_dir.mkdir(parents=True, exist_ok=True)
+            uploads_dir = os.path.join(str(settings.UPLOAD_DIR), user.id)
+            await run_in_threadpool(os.makedirs, uploads_dir, exist_ok=True)
             
             # Generate unique filename
-            unique_filename = f"{file_type}_{uuid.uuid4()}.{file_extension}"
-            file_path = uploads_dir / unique_filename
-            
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(content)
+            file_path = os.path.join(uploads_dir, f"{file_type}_{uuid.uuid4().hex}{file_extension}")
+            
+            # Save file chunk by chunk into a .part file next to the final path, checking
+            # the size limit as it streams, and move it into place once it is complete.
+            # Every disk call in this method (makedirs, open, write, close, replace and
+            # unlink) runs in the threadpool so slow disks don't block the event loop.
+            file_size = 0
+            part_path = f"{file_path}.part"
+            f = await run_in_threadpool(open, part_path, "xb")
+            try:
+                try:
+                    while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+                        file_size += len(chunk)
+                        if file_size > settings.MAX_FILE_SIZE:
+                            raise _file_too_large()
+                        await run_in_threadpool(f.write, chunk)
+                finally:
+                    await run_in_threadpool(f.close)
+                await run_in_threadpool(os.replace, part_path, file_path)
+            except Exception:
+                # Don't leave a partial file behind
+                await run_in_threadpool(os.unlink, part_path)
+                raise
             
             # Prepare file info
             file_info = {
                 "filename": file.filename,
-                "file_path": str(file_path),
-                "file_size": len(content),
+                "file_path": file_path,
+                "file_size": file_size,
                 "uploaded_at": datetime.now(timezone.utc).isoformat()
             }
             
-            # Update user profile with file path
-            success = await self.user_service.update_user_files(user.id, file_type, file_info)
-            if not success:
+            # Update user profile with file path; the file is already in place, so
+            # the profile never points at a missing file
+            try:
+                success = await self.user_service.update_user_files(user.id, file_type, file_info)
+                if not success:
+                    raise HTTPException(status_code=500, detail="Failed to update user profile")
+            except Exception:
                 # Clean up uploaded file if database update fails
-                if file_path.exists():
-                    file_path.unlink()
-                raise HTTPException(status_code=500, detail="Failed to update user profile")
+                await run_in_threadpool(os.unlink, file_path)
+                raise
             
             return {
                 "success": True,
                 "message": "File uploaded successfully",
                 "filename": file.filename,
                 "file_type": file_type,
-                "file_size": len(content),
-                "file_path": str(file_path)
+                "file_size": file_size,
+                "file_path": file_path
             }
             
         except HTTPException:
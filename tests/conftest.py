@@ -3,11 +3,13 @@ Pytest configuration and shared fixtures for TechHub UPE backend tests
 """
 
 import pytest
-import asyncio
+import functools
+import json
 import os
 import sys
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import AsyncGenerator, Generator
+from typing import Generator
 from unittest.mock import Mock, AsyncMock, patch
 
 # Add the parent directory to sys.path to import app modules
@@ -16,11 +18,15 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 # Import FastAPI testing utilities
 try:
     from fastapi.testclient import TestClient
-    from httpx import AsyncClient
 except ImportError:
     # Fallback for when FastAPI is not available during static analysis
     TestClient = None
-    AsyncClient = None
+
+# Faster JSON parsing for API payloads when orjson is installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 # Import app modules
 try:
@@ -37,8 +43,25 @@ except ImportError:
     UserRole = None
     UserService = None
 
+# Recorded API payloads served to offline-marked tests under --offline
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Fixed reference times shared by every fixture in the session
+NOW = datetime.now(timezone.utc)
+FUTURE_7D = NOW + timedelta(days=7)
+
 
 # PYTEST CONFIGURATION
+def pytest_addoption(parser):
+    """Register custom command line options"""
+    parser.addoption(
+        "--offline",
+        action="store_true",
+        default=False,
+        help="serve content lists from tests/fixtures and skip tests that need the live API",
+    )
+
+
 def pytest_configure(config):
     """Configure pytest with custom markers and settings"""
     config.addinivalue_line("markers", "asyncio: mark test as async")
@@ -49,32 +72,38 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "upload: mark test as file upload related")
     config.addinivalue_line("markers", "content: mark test as content verification related")
     config.addinivalue_line("markers", "slow: mark test as slow running")
+    config.addinivalue_line("markers", "offline: mark test as runnable against recorded fixture data")
+    config.addinivalue_line("markers", "xdist_group(name): keep tests on the same pytest-xdist worker")
+    config.addinivalue_line("markers", "no_cover: skip coverage tracing for this test when pytest-cov is in use")
+
+
+# Fixtures that start the app; the content lists only do so outside --offline,
+# where fetch_list reaches api_get through request.getfixturevalue
+LIVE_API_FIXTURES = frozenset({"api_client", "api_get"})
+CONTENT_LIST_FIXTURES = frozenset({"all_courses", "all_events", "all_jobs"})
 
 
 def pytest_collection_modifyitems(config, items):
     """Modify test items during collection"""
+    offline = config.getoption("--offline")
+    skip_live = pytest.mark.skip(reason="needs the live API (run without --offline)")
+    integration_fixtures = LIVE_API_FIXTURES if offline else LIVE_API_FIXTURES | CONTENT_LIST_FIXTURES
     for item in items:
-        # Auto-mark async tests
-        if asyncio.iscoroutinefunction(item.function):
-            item.add_marker(pytest.mark.asyncio)
+        fixturenames = set(item.fixturenames)
         
         # Auto-mark integration tests
-        if "api_client" in item.fixturenames:
+        if integration_fixtures & fixturenames:
             item.add_marker(pytest.mark.integration)
+        
+        # Under --offline only offline-marked tests run against the app
+        if offline and not item.get_closest_marker("offline") and LIVE_API_FIXTURES & fixturenames:
+            item.add_marker(skip_live)
 
 
 # BASIC FIXTURES
 @pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
-
-
-@pytest.fixture
 def api_client() -> Generator[TestClient, None, None]:
-    """Create a test client for the FastAPI application"""
+    """Create a test client for the FastAPI application, shared by the whole session"""
     if TestClient is None or app is None:
         pytest.skip("FastAPI not available")
     
@@ -82,14 +111,15 @@ def api_client() -> Generator[TestClient, None, None]:
         yield client
 
 
-@pytest.fixture
-async def async_client() -> AsyncGenerator[AsyncClient, None]:
-    """Create an async test client for the FastAPI application"""
-    if AsyncClient is None or app is None:
-        pytest.skip("FastAPI not available")
-    
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        yield client
+@pytest.fixture(autouse=True)
+def reset_api_client_cookies(request):
+    """Clear cookies a test left on the shared api_client"""
+    if "api_client" not in request.fixturenames:
+        yield
+        return
+    client = request.getfixturevalue("api_client")
+    yield
+    client.cookies.clear()
 
 
 # DATABASE FIXTURES
@@ -123,13 +153,13 @@ async def test_database():
 
 
 # USER FIXTURES
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_student_user():
     """Create a sample student user for testing"""
     if User is None or UserRole is None:
         pytest.skip("User models not available")
     
-    return User(
+    return User.model_construct(
         id="test-student-123",
         email="student@techhub.edu.py",
         name="Test Student",
@@ -142,13 +172,13 @@ def sample_student_user():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_company_user():
     """Create a sample company user for testing"""
     if User is None or UserRole is None:
         pytest.skip("User models not available")
     
-    return User(
+    return User.model_construct(
         id="test-company-123",
         email="company@testcorp.com",
         name="Test Company Representative",
@@ -160,13 +190,13 @@ def sample_company_user():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_admin_user():
     """Create a sample admin user for testing"""
     if User is None or UserRole is None:
         pytest.skip("User models not available")
     
-    return User(
+    return User.model_construct(
         id="test-admin-123",
         email="admin@techhub.edu.py",
         name="Test Administrator",
@@ -177,70 +207,135 @@ def sample_admin_user():
 
 
 # AUTHENTICATION FIXTURES
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_auth_session():
     """Mock authentication session for testing"""
     return {
         "session_id": "test-session-123",
         "user_id": "test-user-123",
-        "expires_at": "2025-12-31T23:59:59Z",
+        "expires_at": FUTURE_7D.strftime("%Y-%m-%dT%H:%M:%SZ"),
         "token": "test-token-123"
     }
 
 
 @pytest.fixture
-def authenticated_client(api_client, sample_student_user):
+def patched_current_user():
+    """Patch get_current_user once; callers only set the returned user"""
+    with patch('app.core.dependencies.get_current_user') as mock_get_user:
+        yield mock_get_user
+
+
+@pytest.fixture
+def authenticated_client(api_client, patched_current_user, sample_student_user):
     """Create an authenticated test client"""
     if api_client is None:
         pytest.skip("API client not available")
     
-    # Mock authentication
-    with patch('app.core.dependencies.get_current_user') as mock_get_user:
-        mock_get_user.return_value = sample_student_user
-        yield api_client
+    patched_current_user.return_value = sample_student_user
+    return api_client
 
 
 @pytest.fixture
-def authenticated_company_client(api_client, sample_company_user):
+def authenticated_company_client(api_client, patched_current_user, sample_company_user):
     """Create an authenticated company test client"""
     if api_client is None:
         pytest.skip("API client not available")
     
-    with patch('app.core.dependencies.get_current_user') as mock_get_user:
-        mock_get_user.return_value = sample_company_user
-        yield api_client
+    patched_current_user.return_value = sample_company_user
+    return api_client
 
 
 @pytest.fixture
-def authenticated_admin_client(api_client, sample_admin_user):
+def authenticated_admin_client(api_client, patched_current_user, sample_admin_user):
     """Create an authenticated admin test client"""
     if api_client is None:
         pytest.skip("API client not available")
     
-    with patch('app.core.dependencies.get_current_user') as mock_get_user:
-        mock_get_user.return_value = sample_admin_user
-        yield api_client
+    patched_current_user.return_value = sample_admin_user
+    return api_client
 
 
 # SERVICE FIXTURES
+class StubUserService:
+    """Lightweight UserService stand-in exposing only the async methods tests stub"""
+
+    METHODS = (
+        "create_user", "get_user_by_id", "get_user_by_email", "update_user",
+        "delete_user", "get_users_by_role", "create_session",
+        "get_session_by_token", "delete_session", "update_user_files",
+    )
+
+    def __init__(self):
+        for name in self.METHODS:
+            setattr(self, name, AsyncMock())
+
+
 @pytest.fixture
 def mock_user_service():
     """Create a mock user service for testing"""
-    if UserService is None:
-        pytest.skip("UserService not available")
+    return StubUserService()
+
+
+# CONTENT API FIXTURES
+@pytest.fixture(scope="session")
+def api_get(api_client):
+    """Cached GET on the shared api_client, keyed by path and query string (read-only endpoints only)"""
+    return functools.lru_cache(maxsize=None)(api_client.get)
+
+
+def fetch_json(get, path: str):
+    """GET path with the given client callable, check for 200 and parse the body"""
+    response = get(path)
+    assert response.status_code == 200, (path, response.status_code, response.text[:200])
+    return json_loads(response.content)
+
+
+@pytest.fixture(scope="session")
+def fetch():
+    """fetch_json for tests: fetch(get, path) returns the parsed 200 response body"""
+    return fetch_json
+
+
+def fetch_list(request, name: str) -> list:
+    """Return the /api/<name> list, read from tests/fixtures/<name>.json under --offline"""
+    if request.config.getoption("--offline"):
+        return json.loads((FIXTURES_DIR / f"{name}.json").read_text(encoding="utf-8"))
     
-    service = Mock(spec=UserService)
-    service.create_user = AsyncMock()
-    service.get_user_by_id = AsyncMock()
-    service.get_user_by_email = AsyncMock()
-    service.update_user = AsyncMock()
-    service.delete_user = AsyncMock()
-    service.get_users_by_role = AsyncMock()
-    service.create_session = AsyncMock()
-    service.get_session_by_token = AsyncMock()
-    service.delete_session = AsyncMock()
-    service.update_user_files = AsyncMock()
-    return service
+    response = request.getfixturevalue("api_get")(f"/api/{name}")
+    response.raise_for_status()
+    return json_loads(response.content)
+
+
+@pytest.fixture(scope="session")
+def all_courses(request):
+    """Courses from /api/courses, fetched once per test session"""
+    return fetch_list(request, "courses")
+
+
+@pytest.fixture(scope="session")
+def all_events(request):
+    """Events from /api/events, fetched once per test session"""
+    return fetch_list(request, "events")
+
+
+@pytest.fixture(scope="session")
+def normalized_events(all_events):
+    """Events with lowercased title, organizer and location precomputed for matching"""
+    return [
+        {
+            **event,
+            '_title_lower': event.get('title', '').lower(),
+            '_organizer_lower': event.get('organizer', '').lower(),
+            '_location_lower': event.get('location', '').lower(),
+        }
+        for event in all_events
+    ]
+
+
+@pytest.fixture(scope="session")
+def all_jobs(request):
+    """Jobs from /api/jobs, fetched once per test session"""
+    return fetch_list(request, "jobs")
 
 
 # CONTENT FIXTURES
@@ -4,70 +4,68 @@ Test runner for TechHub UPE backend tests
 Run this script to execute all tests with proper configuration
 """
 
+import argparse
 import subprocess
 import sys
 import os
 from pathlib import Path
 
-def run_tests():
+def parse_args(argv=None):
+    """Parse command line options for the test runner"""
+    parser = argparse.ArgumentParser(description="Run TechHub UPE backend tests")
+    parser.add_argument(
+        "--markers",
+        default="",
+        help="Comma-separated markers to re-run on their own after the full suite (e.g. unit,integration)"
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Distribute tests across CPUs with pytest-xdist (-n auto --dist loadgroup); xdist_group tests share a worker"
+    )
+    return parser.parse_args(argv)
+
+def run_tests(argv=None):
     """Run all tests with proper configuration"""
+    args = parse_args(argv)
     
     # Add project root to Python path
     project_root = Path(__file__).parent
     os.environ["PYTHONPATH"] = str(project_root)
     
-    # Test commands to run
+    # The full run already covers every test module, so it is the only suite by default
     test_commands = [
-        # Run all tests with coverage
         [
             "python", "-m", "pytest", 
             "tests/", 
             "-v", 
             "--tb=short",
             "--durations=10",
-            "-x"  # Stop on first failure
-        ],
-        
-        # Run only unit tests
-        [
-            "python", "-m", "pytest", 
-            "tests/", 
-            "-v", 
-            "-m", "unit",
-            "--tb=short"
-        ],
-        
-        # Run only integration tests
-        [
+            "--stepwise"  # Stop on first failure, resume from it on the next run
+        ]
+    ]
+    
+    if args.parallel:
+        # Stepwise needs a single process to track the failing test; loadgroup keeps
+        # each xdist_group (e.g. auth_flow's shared users) on one worker
+        test_commands[0][-1:] = ["-n", "auto", "--dist", "loadgroup"]
+    
+    # Marker-filtered runs only when explicitly requested
+    for marker in filter(None, (m.strip() for m in args.markers.split(","))):
+        test_commands.append([
             "python", "-m", "pytest", 
             "tests/", 
             "-v", 
-            "-m", "integration",
-            "--tb=short"
-        ],
-        
-        # Run content verification tests
-        [
-            "python", "-m", "pytest", 
-            "tests/test_content_verification.py", 
-            "-v", 
-            "--tb=short"
-        ],
-        
-        # Run API endpoint tests
-        [
-            "python", "-m", "pytest", 
-            "tests/test_api_endpoints.py", 
-            "-v", 
-            "--tb=short"
-        ]
-    ]
+            "-m", marker,
+            "--tb=short",
+            "-p", "no:cacheprovider"
+        ])
     
     print("🚀 Starting TechHub UPE Backend Tests")
     print("=" * 60)
     
     for i, cmd in enumerate(test_commands, 1):
-        test_name = " ".join(cmd[-3:]) if "-m" in cmd else cmd[-1]
+        test_name = f"-m {cmd[cmd.index('-m') + 1]}" if "-m" in cmd else cmd[3]
         print(f"\n📋 Running Test Suite {i}/{len(test_commands)}: {test_name}")
         print("-" * 40)
         
@@ -1,8 +1,21 @@
+"""
+Authentication flow tests for local (email/password) authentication
+
+PYTEST_DONT_REWRITE: plain asserts are enough here, skip pytest's assertion rewriting
+
+NOTE: these tests request `test_client` and `sample_users`, which tests/conftest.py
+does not define, so every test here errors at setup until those fixtures exist.
+"""
+
 import pytest
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 import json
 
+# Keep this module on a single xdist worker under --dist loadgroup (legacy_run_tests.py
+# --parallel); the tests share registered users
+pytestmark = pytest.mark.xdist_group("auth_flow")
+
 class TestAuthFlow:
     """Test authentication flow with local authentication"""
 
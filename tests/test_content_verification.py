@@ -1,118 +1,93 @@
+import re
+import time
 import pytest
-import requests
+from collections import Counter
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlsplit
 
-class TestContentVerification:
-    """Test suite for verifying content quality and quantity in TechHub UPE"""
+# Compiled once per session; each check is one case-insensitive scan per string
+PARAGUAY_LOCATION_RE = re.compile(r"paraguay|asunción|ciudad del este", re.IGNORECASE)
+SUSPICIOUS_URL_RE = re.compile(r"example\.com|placeholder|fake|test", re.IGNORECASE)
+HTTP_SCHEMES = ('http', 'https')
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _check_api(request):
+    """Skip the content checks up front if the API cannot serve the course list"""
+    if request.config.getoption("--offline"):
+        return
     
-    @pytest.fixture(autouse=True)
-    def setup(self, api_client):
-        """Setup for each test"""
-        self.client = api_client
-        self.issues = []
-        self.successes = []
+    try:
+        request.getfixturevalue("api_client").get("/api/courses")
+    except Exception as e:
+        pytest.skip(f"API unreachable: {e}")
 
-    def log_issue(self, category: str, message: str):
-        """Log an issue found during testing"""
-        self.issues.append(f"❌ {category}: {message}")
 
-    def log_success(self, category: str, message: str):
-        """Log a success found during testing"""
-        self.successes.append(f"✅ {category}: {message}")
+class TestContentVerification:
+    """Test suite for verifying content quality and quantity in TechHub UPE"""
+
+    # REQUIRED FIELDS VERIFICATION
+    @pytest.mark.offline
+    # Declared up front so collection sees the lists (and marks the test integration)
+    @pytest.mark.usefixtures("all_courses", "all_events", "all_jobs")
+    @pytest.mark.parametrize("items_fixture,required_fields", [
+        ("all_courses", ['title', 'description', 'provider', 'url', 'category']),
+        ("all_events", ['title', 'description', 'organizer', 'url', 'event_date', 'location']),
+        ("all_jobs", ['title', 'company_name', 'description', 'modality', 'job_type', 'apply_url']),
+    ], ids=["courses", "events", "jobs"])
+    def test_required_fields(self, items_fixture, required_fields, request):
+        """Test that all courses, events and jobs have non-empty required fields"""
+        items = request.getfixturevalue(items_fixture)
+        missing = [(item.get('title', 'Unknown'), field) for item in items for field in required_fields if not item.get(field)]
+        assert not missing, f"Missing or empty fields (title, field): {missing}"
 
     # COURSES CONTENT VERIFICATION
-    def test_courses_quantity_requirement(self):
+    @pytest.mark.offline
+    def test_courses_quantity_requirement(self, all_courses):
         """Test that there are at least 20 courses"""
-        response = self.client.get("/api/courses")
-        assert response.status_code == 200
-        courses = response.json()
-        
-        assert len(courses) >= 20, f"Expected at least 20 courses, found {len(courses)}"
-
-    def test_courses_required_fields(self):
-        """Test that all courses have required fields"""
-        response = self.client.get("/api/courses")
-        assert response.status_code == 200
-        courses = response.json()
-        
-        required_fields = ['title', 'description', 'provider', 'url', 'category']
-        
-        for course in courses:
-            for field in required_fields:
-                assert field in course, f"Course '{course.get('title', 'Unknown')}' missing field: {field}"
-                assert course[field], f"Course '{course.get('title', 'Unknown')}' has empty field: {field}"
+        assert len(all_courses) >= 20, f"Expected at least 20 courses, found {len(all_courses)}"
 
-    def test_courses_expected_providers(self):
+    @pytest.mark.offline
+    def test_courses_expected_providers(self, all_courses):
         """Test that courses include expected real providers"""
-        response = self.client.get("/api/courses")
-        assert response.status_code == 200
-        courses = response.json()
-        
         expected_providers = ["Claseflix", "Google Skillshop", "Programación ATS"]
-        found_providers = {course.get('provider', '') for course in courses}
+        all_providers = "\n".join(course.get('provider', '').lower() for course in all_courses)
         
         for expected in expected_providers:
-            provider_found = any(expected.lower() in provider.lower() for provider in found_providers)
-            assert provider_found, f"Expected provider '{expected}' not found in courses"
+            assert expected.lower() in all_providers, f"Expected provider '{expected}' not found in courses"
 
-    def test_courses_category_diversity(self):
+    @pytest.mark.offline
+    def test_courses_category_diversity(self, all_courses):
         """Test that courses have good category diversity"""
-        response = self.client.get("/api/courses")
-        assert response.status_code == 200
-        courses = response.json()
-        
-        categories = {course.get('category') for course in courses if course.get('category')}
+        categories = {course.get('category') for course in all_courses if course.get('category')}
         
         assert len(categories) >= 5, f"Expected at least 5 different categories, found {len(categories)}"
 
-    def test_courses_valid_urls(self):
+    @pytest.mark.offline
+    def test_courses_valid_urls(self, all_courses):
         """Test that course URLs are valid"""
-        response = self.client.get("/api/courses")
-        assert response.status_code == 200
-        courses = response.json()
-        
-        for course in courses:
-            url = course.get('url')
-            assert url, f"Course '{course.get('title')}' missing URL"
-            assert url.startswith(('http://', 'https://')), f"Course '{course.get('title')}' has invalid URL: {url}"
+        bad = [(course.get('title'), course.get('url')) for course in all_courses
+               if urlsplit(course.get('url') or '').scheme not in HTTP_SCHEMES]
+        assert not bad, f"Courses with missing or invalid URLs: {bad}"
 
     # EVENTS CONTENT VERIFICATION
-    def test_events_quantity_requirement(self):
+    @pytest.mark.offline
+    def test_events_quantity_requirement(self, all_events):
         """Test that there are at least 12 events"""
-        response = self.client.get("/api/events")
-        assert response.status_code == 200
-        events = response.json()
-        
-        assert len(events) >= 12, f"Expected at least 12 events, found {len(events)}"
-
-    def test_events_required_fields(self):
-        """Test that all events have required fields"""
-        response = self.client.get("/api/events")
-        assert response.status_code == 200
-        events = response.json()
-        
-        required_fields = ['title', 'description', 'organizer', 'url', 'event_date', 'location']
-        
-        for event in events:
-            for field in required_fields:
-                assert field in event, f"Event '{event.get('title', 'Unknown')}' missing field: {field}"
-                assert event[field], f"Event '{event.get('title', 'Unknown')}' has empty field: {field}"
+        assert len(all_events) >= 12, f"Expected at least 12 events, found {len(all_events)}"
 
-    def test_events_expected_content(self):
+    @pytest.mark.offline
+    def test_events_expected_content(self, normalized_events):
         """Test that events include expected Paraguay-specific content"""
-        response = self.client.get("/api/events")
-        assert response.status_code == 200
-        events = response.json()
-        
         expected_events = ["NASA Space Apps", "Iguassu Valley", "Design Week Asunción"]
         
         for expected in expected_events:
+            needle = expected.lower()
             event_found = False
-            for event in events:
-                title = event.get('title', '').lower()
-                organizer = event.get('organizer', '').lower()
-                if expected.lower() in title or expected.lower() in organizer:
+            for event in normalized_events:
+                if needle in event['_title_lower'] or needle in event['_organizer_lower']:
                     event_found = True
                     break
             
@@ -120,256 +95,181 @@ class TestContentVerification:
             if not event_found:
                 print(f"Note: Expected event '{expected}' not found (this may be expected)")
 
-    def test_events_paraguay_locations(self):
+    @pytest.mark.offline
+    def test_events_paraguay_locations(self, normalized_events):
         """Test that events include Paraguay-specific locations"""
-        response = self.client.get("/api/events")
-        assert response.status_code == 200
-        events = response.json()
-        
-        paraguay_locations = ['paraguay', 'asunción', 'ciudad del este']
-        paraguay_events = 0
-        
-        for event in events:
-            location = event.get('location', '').lower()
-            if any(loc in location for loc in paraguay_locations):
-                paraguay_events += 1
+        paraguay_events = sum(1 for event in normalized_events if PARAGUAY_LOCATION_RE.search(event['_location_lower']))
         
         # Should have at least some Paraguay-related events
         assert paraguay_events > 0, "No Paraguay-specific events found"
 
-    def test_events_valid_dates(self):
+    @pytest.mark.offline
+    def test_events_valid_dates(self, all_events):
         """Test that event dates are in valid format"""
-        response = self.client.get("/api/events")
-        assert response.status_code == 200
-        events = response.json()
-        
-        for event in events:
+        for event in all_events:
             event_date = event.get('event_date')
             assert event_date, f"Event '{event.get('title')}' missing event_date"
             
             # Try to parse the date to ensure it's valid
             try:
-                datetime.fromisoformat(event_date.replace('Z', '+00:00'))
+                datetime.fromisoformat(event_date)
             except ValueError:
                 pytest.fail(f"Event '{event.get('title')}' has invalid date format: {event_date}")
 
     # JOBS CONTENT VERIFICATION
-    def test_jobs_quantity_requirement(self):
+    @pytest.mark.offline
+    def test_jobs_quantity_requirement(self, all_jobs):
         """Test that there are at least 6 job vacancies"""
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
-        
-        assert len(jobs) >= 6, f"Expected at least 6 jobs, found {len(jobs)}"
-
-    def test_jobs_required_fields(self):
-        """Test that all jobs have required fields"""
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
-        
-        required_fields = ['title', 'company_name', 'description', 'modality', 'job_type', 'apply_url']
-        
-        for job in jobs:
-            for field in required_fields:
-                assert field in job, f"Job '{job.get('title', 'Unknown')}' missing field: {field}"
-                assert job[field], f"Job '{job.get('title', 'Unknown')}' has empty field: {field}"
+        assert len(all_jobs) >= 6, f"Expected at least 6 jobs, found {len(all_jobs)}"
 
-    def test_jobs_expected_companies(self):
+    @pytest.mark.offline
+    def test_jobs_expected_companies(self, all_jobs):
         """Test that jobs include expected real companies"""
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
-        
         expected_companies = ["Tigo", "Banco Continental", "Copetrol"]
-        found_companies = {job.get('company_name', '') for job in jobs}
+        all_companies = "\n".join(job.get('company_name', '').lower() for job in all_jobs)
         
         for expected in expected_companies:
-            company_found = any(expected.lower() in company.lower() for company in found_companies)
             # Note: This is a soft assertion since exact companies may vary
-            if not company_found:
+            if expected.lower() not in all_companies:
                 print(f"Note: Expected company '{expected}' not found (this may be expected)")
 
-    def test_jobs_real_apply_urls(self):
+    @pytest.mark.offline
+    def test_jobs_real_apply_urls(self, all_jobs):
         """Test that jobs have real, non-placeholder apply URLs"""
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
-        
-        suspicious_patterns = ['example.com', 'placeholder', 'fake', 'test']
-        real_urls = 0
-        
-        for job in jobs:
-            apply_url = job.get('apply_url', '')
-            if apply_url and apply_url.startswith('http'):
-                is_suspicious = any(pattern in apply_url.lower() for pattern in suspicious_patterns)
-                if not is_suspicious:
-                    real_urls += 1
+        real_urls = sum(
+            1 for job in all_jobs
+            if urlsplit(job.get('apply_url') or '').scheme in HTTP_SCHEMES
+            and not SUSPICIOUS_URL_RE.search(job['apply_url'])
+        )
         
         # At least 80% should have real URLs
-        expected_real_urls = len(jobs) * 0.8
-        assert real_urls >= expected_real_urls, f"Only {real_urls}/{len(jobs)} jobs have real apply URLs (expected at least {expected_real_urls})"
+        expected_real_urls = len(all_jobs) * 0.8
+        assert real_urls >= expected_real_urls, f"Only {real_urls}/{len(all_jobs)} jobs have real apply URLs (expected at least {expected_real_urls})"
 
-    def test_jobs_valid_enums(self):
+    @pytest.mark.offline
+    def test_jobs_valid_enums(self, all_jobs):
         """Test that jobs use valid enum values"""
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
+        valid_modalities = {'remoto', 'presencial', 'hibrido'}
+        valid_job_types = {'practica', 'pasantia', 'junior', 'medio', 'senior'}
         
-        valid_modalities = ['remoto', 'presencial', 'hibrido']
-        valid_job_types = ['practica', 'pasantia', 'junior', 'medio', 'senior']
+        invalid_modalities = {job.get('modality') for job in all_jobs} - valid_modalities
+        invalid_job_types = {job.get('job_type') for job in all_jobs} - valid_job_types
         
-        for job in jobs:
-            modality = job.get('modality')
-            job_type = job.get('job_type')
-            
-            assert modality in valid_modalities, f"Job '{job.get('title')}' has invalid modality: {modality}"
-            assert job_type in valid_job_types, f"Job '{job.get('title')}' has invalid job_type: {job_type}"
+        assert not invalid_modalities, f"Jobs use invalid modalities: {invalid_modalities}"
+        assert not invalid_job_types, f"Jobs use invalid job_types: {invalid_job_types}"
 
-    def test_jobs_geographic_requirements(self):
+    @pytest.mark.offline
+    def test_jobs_geographic_requirements(self, all_jobs):
         """Test that presencial jobs are in Ciudad del Este"""
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
-        
-        for job in jobs:
-            if job.get('modality') == 'presencial':
-                city = job.get('city')
-                assert city == 'Ciudad del Este', f"Presencial job '{job.get('title')}' should be in Ciudad del Este, but is in '{city}'"
+        misplaced = [(job.get('title'), job.get('city')) for job in all_jobs
+                     if job.get('modality') == 'presencial' and job.get('city') != 'Ciudad del Este']
+        assert not misplaced, f"Presencial jobs should be in Ciudad del Este, found (title, city): {misplaced}"
 
     # FILTER FUNCTIONALITY VERIFICATION
-    def test_course_filters_work_correctly(self):
+    def test_course_filters_work_correctly(self, all_courses, api_get, fetch):
         """Test that course category filters work as expected"""
-        # Get all courses
-        all_response = self.client.get("/api/courses")
-        assert all_response.status_code == 200
-        all_courses = all_response.json()
-        
         if all_courses:
-            # Get unique categories
-            categories = list(set(course.get('category') for course in all_courses if course.get('category')))
+            # Count courses per category in the unfiltered list
+            expected = Counter(course.get('category') for course in all_courses if course.get('category'))
             
-            # Test filtering by each category
-            for category in categories[:3]:  # Test first 3 categories
-                filtered_response = self.client.get(f"/api/courses?category={category}")
-                assert filtered_response.status_code == 200
-                filtered_courses = filtered_response.json()
+            # Test filtering by each category, requesting them concurrently
+            categories = list(expected)[:3]  # Test first 3 categories
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                results = list(executor.map(
+                    lambda category: fetch(api_get, f"/api/courses?category={category}"), categories
+                ))
+            
+            for category, filtered_courses in zip(categories, results):
+                # Both lists are capped by the default page size, so the filtered one can only hold more
+                assert len(filtered_courses) >= expected[category], f"Filter for '{category}' returned {len(filtered_courses)} courses, expected at least {expected[category]}"
                 
                 # All returned courses should match the category
                 for course in filtered_courses:
                     assert course.get('category') == category, f"Filter failed: expected category '{category}', got '{course.get('category')}'"
 
-    def test_job_filters_work_correctly(self):
+    def test_job_filters_work_correctly(self, all_jobs, api_get, fetch):
         """Test that job modality filters work as expected"""
-        # Get all jobs
-        all_response = self.client.get("/api/jobs")
-        assert all_response.status_code == 200
-        all_jobs = all_response.json()
-        
         if all_jobs:
             # Get unique modalities
             modalities = list(set(job.get('modality') for job in all_jobs if job.get('modality')))
             
             # Test filtering by each modality
             for modality in modalities:
-                filtered_response = self.client.get(f"/api/jobs?modality={modality}")
-                assert filtered_response.status_code == 200
-                filtered_jobs = filtered_response.json()
+                filtered_jobs = fetch(api_get, f"/api/jobs?modality={modality}")
                 
                 # All returned jobs should match the modality
                 for job in filtered_jobs:
                     assert job.get('modality') == modality, f"Filter failed: expected modality '{modality}', got '{job.get('modality')}'"
 
-    def test_search_functionality(self):
+    def test_search_functionality(self, api_client, fetch):
         """Test that search parameters work"""
         # Test course search
-        response = self.client.get("/api/courses?search=python")
-        assert response.status_code == 200
+        fetch(api_client.get, "/api/courses?search=python")
         
         # Test event search
-        response = self.client.get("/api/events?search=tech")
-        assert response.status_code == 200
+        fetch(api_client.get, "/api/events?search=tech")
 
     # SAVED ITEMS SECURITY VERIFICATION
-    def test_saved_items_security(self):
+    @pytest.mark.parametrize("method,endpoint,payload", [
+        ("GET", "/api/saved-items", None),
+        ("POST", "/api/saved-items", {"item_id": "test", "item_type": "course"}),
+        ("DELETE", "/api/saved-items/test-id?item_type=course", None),
+    ])
+    def test_saved_items_security(self, method, endpoint, payload, api_client):
         """Test that saved items endpoints require authentication"""
-        # Get saved items should require auth
-        response = self.client.get("/api/saved-items")
-        assert response.status_code == 401, "Saved items endpoint should require authentication"
-        
-        # Save item should require auth
-        response = self.client.post("/api/saved-items", json={"item_id": "test", "item_type": "course"})
-        assert response.status_code == 401, "Save item endpoint should require authentication"
-        
-        # Delete saved item should require auth
-        response = self.client.delete("/api/saved-items/test-id?item_type=course")
-        assert response.status_code == 401, "Delete saved item endpoint should require authentication"
+        response = api_client.request(method, endpoint, json=payload)
+        assert response.status_code == 401, f"Saved items endpoint {method} {endpoint} should require authentication"
 
     # DATA CONSISTENCY TESTS
-    def test_data_consistency(self):
+    def test_data_consistency(self, all_jobs, api_get):
         """Test that data is consistent across endpoints"""
         # Test that all referenced IDs exist
-        response = self.client.get("/api/jobs")
-        assert response.status_code == 200
-        jobs = response.json()
-        
-        for job in jobs:
+        for job in all_jobs:
             # Verify job has valid ID
-            job_id = job.get('id')
-            assert job_id, f"Job '{job.get('title')}' missing ID"
-            
-            # Verify individual job endpoint works
-            individual_response = self.client.get(f"/api/jobs/{job_id}")
-            assert individual_response.status_code == 200, f"Job with ID {job_id} not accessible individually"
+            assert job.get('id'), f"Job '{job.get('title')}' missing ID"
+        
+        # Verify individual job endpoints work, fetching them concurrently
+        job_ids = [job['id'] for job in all_jobs]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda job_id: api_get(f"/api/jobs/{job_id}"), job_ids))
+        bad = [job_id for job_id, individual_response in zip(job_ids, responses) if individual_response.status_code != 200]
+        assert not bad, f"Jobs not accessible individually: {bad}"
 
     # PERFORMANCE TESTS
-    def test_response_times(self):
+    @pytest.mark.parametrize("endpoint", ["/api/courses", "/api/events", "/api/jobs"])
+    def test_response_times(self, api_client, endpoint):
         """Test that API responses are reasonably fast"""
-        import time
-        
-        endpoints = ["/api/courses", "/api/events", "/api/jobs"]
+        start_time = time.perf_counter()
+        response = api_client.get(endpoint)
+        response_time = time.perf_counter() - start_time
         
-        for endpoint in endpoints:
-            start_time = time.time()
-            response = self.client.get(endpoint)
-            end_time = time.time()
-            
-            response_time = end_time - start_time
-            assert response_time < 5.0, f"Endpoint {endpoint} took {response_time:.2f}s (should be < 5s)"
+        assert response.status_code == 200
+        assert response_time < 5.0, f"Endpoint {endpoint} took {response_time:.2f}s (should be < 5s)"
 
     # PAGINATION TESTS
-    def test_pagination_works(self):
+    def test_pagination_works(self, api_client, fetch):
         """Test that pagination parameters work correctly"""
-        # Test different limits
-        for limit in [1, 5, 10, 20]:
-            response = self.client.get(f"/api/courses?limit={limit}")
-            assert response.status_code == 200
-            courses = response.json()
+        # Test different limits, requesting them concurrently
+        limits = [1, 5, 10, 20]
+        with ThreadPoolExecutor(max_workers=len(limits)) as executor:
+            results = list(executor.map(
+                lambda limit: fetch(api_client.get, f"/api/courses?limit={limit}"), limits
+            ))
+        
+        for limit, courses in zip(limits, results):
             assert len(courses) <= limit, f"Returned {len(courses)} courses, expected max {limit}"
 
     # CONTENT QUALITY TESTS
-    def test_content_quality(self):
+    @pytest.mark.offline
+    def test_content_quality(self, all_courses, all_events, all_jobs):
         """Test overall content quality metrics"""
-        # Get all content
-        courses_response = self.client.get("/api/courses")
-        events_response = self.client.get("/api/events")
-        jobs_response = self.client.get("/api/jobs")
-        
-        assert courses_response.status_code == 200
-        assert events_response.status_code == 200
-        assert jobs_response.status_code == 200
-        
-        courses = courses_response.json()
-        events = events_response.json()
-        jobs = jobs_response.json()
-        
         # Overall content should meet minimum requirements
-        total_content = len(courses) + len(events) + len(jobs)
+        total_content = len(all_courses) + len(all_events) + len(all_jobs)
         assert total_content >= 38, f"Total content items {total_content} below minimum (20 courses + 12 events + 6 jobs = 38)"
         
         # Content should be diverse
-        course_categories = {course.get('category') for course in courses}
-        job_companies = {job.get('company_name') for job in jobs}
+        course_categories = {course.get('category') for course in all_courses}
+        job_companies = {job.get('company_name') for job in all_jobs}
         
         assert len(course_categories) >= 3, "Course categories should be diverse"
-        assert len(job_companies) >= 3, "Job companies should be diverse"
\ No newline at end of file
+        assert len(job_companies) >= 3, "Job companies should be diverse"
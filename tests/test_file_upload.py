@@ -1,24 +1,49 @@
 import pytest
+import asyncio
 import io
 import tempfile
 import os
-from unittest.mock import Mock, AsyncMock, patch, mock_open
+import stat
+import tracemalloc
+from unittest.mock import Mock, AsyncMock, patch
 from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
 from pathlib import Path
+from typing import Optional
 
-from app.controllers.user_controller import UserController
+from app.controllers.user_controller import UserController, _UPLOAD_CHUNK_SIZE, _validate_upload
 from app.services.user_service import UserService
 from app.models.user import User
 from app.models.enums import UserRole
 
 
+# Attribute names of UserService, introspected once for every mock_user_service
+_USER_SERVICE_SPEC = dir(UserService)
+
+# Shared headers for the default PDF content type, built once for all tests
+_PDF_HEADERS = Headers(raw=[(b"content-type", b"application/pdf")])
+
+
+def zero_reader(size: int):
+    """read(n) stand-in serving `size` zero bytes without allocating them up front"""
+    remaining = size
+
+    def read(n: int = -1) -> bytes:
+        nonlocal remaining
+        chunk = bytes(remaining if n < 0 else min(n, remaining))
+        remaining -= len(chunk)
+        return chunk
+
+    return read
+
+
 class TestFileUpload:
     """Test suite for file upload functionality"""
 
     @pytest.fixture
     def mock_user_service(self):
         """Mock user service for testing"""
-        service = Mock(spec=UserService)
+        service = Mock(spec_set=_USER_SERVICE_SPEC)
         service.update_user_files = AsyncMock()
         return service
 
@@ -27,8 +52,9 @@ class TestFileUpload:
         """Create user controller with mocked dependencies"""
         return UserController(mock_user_service)
 
-    @pytest.fixture
-    def test_user(self):
+    @pytest.fixture(scope="class")
+    @classmethod
+    def test_user(cls):
         """Sample user for testing"""
         return User(
             id="test-user-123",
@@ -39,236 +65,301 @@ class TestFileUpload:
         )
 
     @pytest.fixture
-    def mock_settings(self):
-        """Mock settings for testing"""
+    def mock_settings(self, tmp_path):
+        """Mock settings for testing, saving uploads under the test's tmp_path"""
         with patch('app.controllers.user_controller.settings') as mock_settings:
-            mock_settings.UPLOAD_DIR = Path("/tmp/test_uploads")
+            mock_settings.UPLOAD_DIR = tmp_path / "uploads"
             mock_settings.MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
             yield mock_settings
 
-    def create_mock_upload_file(self, filename: str, content: bytes, content_type: str = "application/pdf"):
-        """Create a mock UploadFile for testing"""
+    @pytest.fixture
+    def user_dir(self, mock_settings, test_user) -> Path:
+        """Directory the test user's uploads are saved to"""
+        return mock_settings.UPLOAD_DIR / test_user.id
+
+    @pytest.fixture
+    def controller_os(self):
+        """The controller's os module, wrapped so a test can make single calls fail"""
+        with patch('app.controllers.user_controller.os', Mock(wraps=os)) as mock_os:
+            yield mock_os
+
+    def create_mock_upload_file(self, filename: str, content: bytes, content_type: str = "application/pdf", size: Optional[int] = None):
+        """Create a mock UploadFile for testing
+
+        With a size and no content, the file declares that size and read() serves
+        zero bytes chunk by chunk, so large uploads never exist in memory at once.
+        """
         file_like = io.BytesIO(content)
         upload_file = UploadFile(
             filename=filename,
             file=file_like,
-            headers={"content-type": content_type}
+            size=size,
+            headers=_PDF_HEADERS if content_type == "application/pdf" else Headers({"content-type": content_type})
         )
-        # Mock the read method to return the content
-        upload_file.read = AsyncMock(return_value=content)
+        # Mock the read method to serve the content in read(size) chunks
+        upload_file.read = AsyncMock(side_effect=zero_reader(size) if size and not content else file_like.read)
         return upload_file
 
     # VALID FILE UPLOAD TESTS
-    @pytest.mark.asyncio
-    async def test_upload_cv_file_success(self, user_controller, mock_user_service, test_user, mock_settings):
-        """Test successful CV file upload"""
+    @pytest.mark.parametrize("file_type,filename", [
+        ("cv", "test_cv.pdf"),
+        ("certificate", "certificate.pdf"),
+        ("degree", "degree.pdf"),
+    ])
+    async def test_upload_file_success(self, file_type, filename, user_controller, mock_user_service, test_user, mock_settings):
+        """Test successful CV, certificate and degree file upload"""
         # Create mock PDF content
         pdf_content = b"%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n>>\nendobj\nxref\ntrailer\n<<\n/Size 1\n/Root 1 0 R\n>>\nstartxref\n%%EOF"
-        mock_file = self.create_mock_upload_file("test_cv.pdf", pdf_content)
+        mock_file = self.create_mock_upload_file(filename, pdf_content)
 
-        # Mock file operations
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            # Mock successful database update
-            mock_user_service.update_user_files.return_value = True
+        # Mock successful database update
+        mock_user_service.update_user_files.return_value = True
 
-            result = await user_controller.upload_file(mock_file, "cv", test_user)
+        result = await user_controller.upload_file(mock_file, file_type, test_user)
 
-            # Assertions
-            assert result["success"] == True
-            assert result["message"] == "File uploaded successfully"
-            assert result["filename"] == "test_cv.pdf"
-            assert result["file_type"] == "cv"
-            assert result["file_size"] == len(pdf_content)
-
-            # Verify database update was called
-            mock_user_service.update_user_files.assert_called_once()
-            call_args = mock_user_service.update_user_files.call_args[0]
-            assert call_args[0] == test_user.id
-            assert call_args[1] == "cv"
-            
-            # Verify file info structure
-            file_info = call_args[2]
-            assert file_info["filename"] == "test_cv.pdf"
-            assert file_info["file_size"] == len(pdf_content)
-            assert "uploaded_at" in file_info
-
-    @pytest.mark.asyncio
-    async def test_upload_certificate_file_success(self, user_controller, mock_user_service, test_user, mock_settings):
-        """Test successful certificate file upload"""
-        pdf_content = b"%PDF-1.4\ntest certificate content"
-        mock_file = self.create_mock_upload_file("certificate.pdf", pdf_content)
-
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
-
-            result = await user_controller.upload_file(mock_file, "certificate", test_user)
-
-            assert result["success"] == True
-            assert result["file_type"] == "certificate"
+        # Assertions
+        assert result["success"] == True
+        assert result["message"] == "File uploaded successfully"
+        assert result["filename"] == filename
+        assert result["file_type"] == file_type
+        assert result["file_size"] == len(pdf_content)
 
-    @pytest.mark.asyncio
-    async def test_upload_degree_file_success(self, user_controller, mock_user_service, test_user, mock_settings):
-        """Test successful degree file upload"""
-        pdf_content = b"%PDF-1.4\ntest degree content"
-        mock_file = self.create_mock_upload_file("degree.pdf", pdf_content)
+        # Verify database update was called
+        mock_user_service.update_user_files.assert_called_once()
+        call_args = mock_user_service.update_user_files.call_args[0]
+        assert call_args[0] == test_user.id
+        assert call_args[1] == file_type
+        
+        # Verify file info structure
+        file_info = call_args[2]
+        assert file_info["filename"] == filename
+        assert file_info["file_size"] == len(pdf_content)
+        assert "uploaded_at" in file_info
+
+        # The upload is saved whole, with no .part file left behind
+        saved = Path(result["file_path"])
+        assert saved.read_bytes() == pdf_content
+        assert [path.name for path in saved.parent.iterdir()] == [saved.name]
+
+    async def test_upload_saves_file_with_default_permissions(self, user_controller, mock_user_service, test_user, mock_settings, user_dir):
+        """Test that the saved upload gets the umask's default mode and no .part file is left"""
+        pdf_content = b"%PDF-1.4\ntest content"
+        mock_file = self.create_mock_upload_file("cv.pdf", pdf_content)
+        mock_user_service.update_user_files.return_value = True
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
+        umask = os.umask(0)
+        os.umask(umask)
 
-            result = await user_controller.upload_file(mock_file, "degree", test_user)
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
 
-            assert result["success"] == True
-            assert result["file_type"] == "degree"
+        saved = Path(result["file_path"])
+        assert saved.read_bytes() == pdf_content
+        assert stat.S_IMODE(saved.stat().st_mode) == 0o666 & ~umask
+        assert [path.name for path in user_dir.iterdir()] == [saved.name]
 
     # FILE TYPE VALIDATION TESTS
-    @pytest.mark.asyncio
     async def test_upload_invalid_file_type(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload fails with invalid file type"""
         pdf_content = b"%PDF-1.4\ntest content"
         mock_file = self.create_mock_upload_file("test.pdf", pdf_content)
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="Invalid file type.*cv, certificate, degree") as exc_info:
             await user_controller.upload_file(mock_file, "invalid_type", test_user)
 
         assert exc_info.value.status_code == 400
-        assert "Invalid file type" in str(exc_info.value.detail)
-        assert "cv, certificate, degree" in str(exc_info.value.detail)
 
     # FILE EXTENSION VALIDATION TESTS
-    @pytest.mark.asyncio
     async def test_upload_non_pdf_file(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload fails with non-PDF file"""
         txt_content = b"This is a text file"
         mock_file = self.create_mock_upload_file("test.txt", txt_content, "text/plain")
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="Only PDF files are allowed") as exc_info:
             await user_controller.upload_file(mock_file, "cv", test_user)
 
         assert exc_info.value.status_code == 400
-        assert "Only PDF files are allowed" in str(exc_info.value.detail)
+        # Rejected on the extension alone, without reading the content
+        mock_file.read.assert_not_called()
+
+    async def test_upload_pdf_extension_with_non_pdf_content_type(self, user_controller, mock_user_service, test_user, mock_settings):
+        """Test upload fails when a .pdf file declares a non-PDF content type"""
+        mock_file = self.create_mock_upload_file("notes.pdf", b"This is a text file", "text/plain")
+
+        with pytest.raises(HTTPException, match="Only PDF files are allowed") as exc_info:
+            await user_controller.upload_file(mock_file, "cv", test_user)
+
+        assert exc_info.value.status_code == 400
+        mock_file.read.assert_not_called()
+
+    @pytest.mark.parametrize("content_type", [
+        "application/pdf; name=cv.pdf",
+        "Application/PDF",
+        "application/x-pdf",
+        " application/octet-stream ",
+    ])
+    async def test_upload_accepts_pdf_content_type_variants(self, content_type, user_controller, mock_user_service, test_user, mock_settings):
+        """Test upload accepts PDF content types, including legacy x-pdf, parameters, other casing or padding"""
+        pdf_content = b"%PDF-1.4\ntest content"
+        mock_file = self.create_mock_upload_file("cv.pdf", pdf_content, content_type)
 
-    @pytest.mark.asyncio
-    async def test_upload_file_without_extension(self, user_controller, mock_user_service, test_user, mock_settings):
+        mock_user_service.update_user_files.return_value = True
+
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
+
+        assert result["success"] == True
+        assert result["file_size"] == len(pdf_content)
+
+    @pytest.mark.parametrize("content", [b"some content", b"GIF89a", b"%PD"], ids=["text", "gif", "short"])
+    async def test_upload_file_without_extension(self, content, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload fails with file without extension"""
-        content = b"some content"
         mock_file = self.create_mock_upload_file("testfile", content)
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="Only PDF files are allowed") as exc_info:
             await user_controller.upload_file(mock_file, "cv", test_user)
 
         assert exc_info.value.status_code == 400
-        assert "Only PDF files are allowed" in str(exc_info.value.detail)
 
-    @pytest.mark.asyncio
+    async def test_upload_file_without_extension_pdf_header(self, user_controller, mock_user_service, test_user, mock_settings):
+        """Test upload accepts a file without extension when its header is a PDF"""
+        pdf_content = b"%PDF-1.4\ntest content"
+        mock_file = self.create_mock_upload_file("scan", pdf_content)
+
+        mock_user_service.update_user_files.return_value = True
+
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
+
+        # The sniffed header is rewound, so the whole file is saved as a .pdf
+        assert result["success"] == True
+        assert result["file_size"] == len(pdf_content)
+        assert result["file_path"].endswith(".pdf")
+
     async def test_upload_file_no_filename(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload fails with no filename"""
         content = b"some content"
         mock_file = self.create_mock_upload_file(None, content)
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="No filename provided") as exc_info:
             await user_controller.upload_file(mock_file, "cv", test_user)
 
         assert exc_info.value.status_code == 400
-        assert "No filename provided" in str(exc_info.value.detail)
 
     # FILE SIZE VALIDATION TESTS
-    @pytest.mark.asyncio
     async def test_upload_file_too_large(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload fails with file exceeding size limit"""
-        # Create content larger than 10MB
-        large_content = b"x" * (11 * 1024 * 1024)  # 11MB
-        mock_file = self.create_mock_upload_file("large_file.pdf", large_content)
+        # Declare a size larger than 10MB
+        mock_file = self.create_mock_upload_file("large_file.pdf", b"", size=11 * 1024 * 1024)  # 11MB
+
+        with pytest.raises(HTTPException, match="File size exceeds maximum.*10MB") as exc_info:
+            await user_controller.upload_file(mock_file, "cv", test_user)
 
-        with pytest.raises(HTTPException) as exc_info:
+        assert exc_info.value.status_code == 400
+        
+        # The declared size is rejected before anything is read or written
+        mock_file.read.assert_not_called()
+        assert not mock_settings.UPLOAD_DIR.exists()
+
+    async def test_upload_file_too_large_without_declared_size(self, user_controller, mock_user_service, test_user, mock_settings, user_dir):
+        """Test upload stops streaming at the size limit when no size was declared"""
+        mock_file = self.create_mock_upload_file("large_file.pdf", b"", size=11 * 1024 * 1024)  # 11MB
+        mock_file.size = None
+
+        with pytest.raises(HTTPException, match="File size exceeds maximum.*10MB") as exc_info:
             await user_controller.upload_file(mock_file, "cv", test_user)
 
         assert exc_info.value.status_code == 400
-        assert "File size exceeds maximum" in str(exc_info.value.detail)
-        assert "10MB" in str(exc_info.value.detail)
 
-    @pytest.mark.asyncio
+        # Streaming stops at the limit and the partial .part file is removed
+        assert mock_file.read.await_count == 11
+        assert list(user_dir.iterdir()) == []
+
     async def test_upload_empty_file(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload with empty file"""
         empty_content = b""
         mock_file = self.create_mock_upload_file("empty.pdf", empty_content)
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
+        mock_user_service.update_user_files.return_value = True
 
-            result = await user_controller.upload_file(mock_file, "cv", test_user)
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
 
-            # Empty files should be allowed (some PDFs might be very small)
-            assert result["success"] == True
-            assert result["file_size"] == 0
+        # Empty files should be allowed (some PDFs might be very small)
+        assert result["success"] == True
+        assert result["file_size"] == 0
+
+    # METADATA VALIDATION TESTS (sync, no upload or event loop involved)
+    @pytest.mark.parametrize("filename,file_type,size,content_type,detail", [
+        ("test.pdf", "invalid_type", None, "application/pdf", "Invalid file type.*cv, certificate, degree"),
+        (None, "cv", None, "application/pdf", "No filename provided"),
+        ("test.txt", "cv", None, "text/plain", "Only PDF files are allowed"),
+        ("test.pdf", "cv", None, "text/plain; charset=utf-8", "Only PDF files are allowed"),
+        ("test.txt", "cv", None, "application/pdf", "Only PDF files are allowed"),
+        ("test.pdf", "cv", 11 * 1024 * 1024, "application/pdf", "File size exceeds maximum.*10MB"),
+    ])
+    def test_validate_upload_rejects(self, filename, file_type, size, content_type, detail, mock_settings):
+        """Test that invalid upload metadata is rejected before any read"""
+        with pytest.raises(HTTPException, match=detail) as exc_info:
+            _validate_upload(filename, file_type, size, content_type)
+
+        assert exc_info.value.status_code == 400
+
+    @pytest.mark.parametrize("filename,expected_extension", [
+        ("test.pdf", ".pdf"),
+        ("test.PDF", ".pdf"),
+        ("testfile", ""),
+    ])
+    def test_validate_upload_returns_extension(self, filename, expected_extension, mock_settings):
+        """Test that valid metadata yields the lowercased extension, or "" when it must be sniffed"""
+        assert _validate_upload(filename, "cv", 1024, "application/pdf") == expected_extension
 
     # DIRECTORY CREATION TESTS
-    @pytest.mark.asyncio
-    async def test_upload_creates_user_directory(self, user_controller, mock_user_service, test_user, mock_settings):
+    async def test_upload_creates_user_directory(self, user_controller, mock_user_service, test_user, mock_settings, user_dir):
         """Test that upload creates user-specific directory"""
         pdf_content = b"%PDF-1.4\ntest content"
         mock_file = self.create_mock_upload_file("test.pdf", pdf_content)
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
+        mock_user_service.update_user_files.return_value = True
 
-            await user_controller.upload_file(mock_file, "cv", test_user)
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
 
-            # Verify directory creation was called
-            mock_mkdir.assert_called_once()
-            call_args = mock_mkdir.call_args
-            assert call_args[1]["parents"] == True
-            assert call_args[1]["exist_ok"] == True
+        # The file is saved in the user's own directory
+        assert user_dir.is_dir()
+        assert Path(result["file_path"]).parent == user_dir
 
     # DATABASE UPDATE FAILURE TESTS
-    @pytest.mark.asyncio
-    async def test_upload_database_update_failure(self, user_controller, mock_user_service, test_user, mock_settings):
+    async def test_upload_database_update_failure(self, user_controller, mock_user_service, test_user, mock_settings, user_dir):
         """Test upload handles database update failure with cleanup"""
         pdf_content = b"%PDF-1.4\ntest content"
         mock_file = self.create_mock_upload_file("test.pdf", pdf_content)
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=True) as mock_exists, \
-             patch('pathlib.Path.unlink') as mock_unlink:
-            
-            # Mock database update failure
-            mock_user_service.update_user_files.return_value = False
+        # Mock database update failure
+        mock_user_service.update_user_files.return_value = False
 
-            with pytest.raises(HTTPException) as exc_info:
-                await user_controller.upload_file(mock_file, "cv", test_user)
+        with pytest.raises(HTTPException, match="Failed to update user profile") as exc_info:
+            await user_controller.upload_file(mock_file, "cv", test_user)
 
-            assert exc_info.value.status_code == 500
-            assert "Failed to update user profile" in str(exc_info.value.detail)
-            
-            # Verify cleanup was attempted
-            mock_unlink.assert_called_once()
+        assert exc_info.value.status_code == 500
+
+        # The saved file is removed again since the profile doesn't point at it
+        assert list(user_dir.iterdir()) == []
+
+    async def test_upload_replace_failure_leaves_profile_unchanged(self, user_controller, mock_user_service, test_user, mock_settings, user_dir, controller_os):
+        """Test that a failed move into place removes the .part file and never updates the profile"""
+        mock_file = self.create_mock_upload_file("test.pdf", b"%PDF-1.4\ntest content")
+        controller_os.replace.side_effect = OSError("Disk error")
+
+        with pytest.raises(HTTPException, match="File upload failed") as exc_info:
+            await user_controller.upload_file(mock_file, "cv", test_user)
+
+        assert exc_info.value.status_code == 500
+        mock_user_service.update_user_files.assert_not_awaited()
+        assert list(user_dir.iterdir()) == []
 
     # FILE NAMING TESTS
-    @pytest.mark.asyncio
     async def test_upload_generates_unique_filename(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test that upload generates unique filenames"""
         pdf_content = b"%PDF-1.4\ntest content"
         mock_file = self.create_mock_upload_file("test.pdf", pdf_content)
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False), \
-             patch('uuid.uuid4', return_value=Mock(hex='123e4567e89b12d3a456426614174000')):
+        with patch('uuid.uuid4', return_value=Mock(hex='123e4567e89b12d3a456426614174000')):
             
             mock_user_service.update_user_files.return_value = True
 
@@ -278,7 +369,6 @@ class TestFileUpload:
             assert "cv_123e4567e89b12d3a456426614174000.pdf" in result["file_path"]
 
     # CONCURRENT UPLOAD TESTS
-    @pytest.mark.asyncio
     async def test_multiple_file_uploads_for_same_user(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test multiple file uploads for the same user"""
         files_data = [
@@ -287,50 +377,48 @@ class TestFileUpload:
             ("degree.pdf", "degree", b"%PDF-1.4\ndegree content")
         ]
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
+        mock_user_service.update_user_files.return_value = True
 
-            for filename, file_type, content in files_data:
-                mock_file = self.create_mock_upload_file(filename, content)
-                result = await user_controller.upload_file(mock_file, file_type, test_user)
-                
-                assert result["success"] == True
-                assert result["file_type"] == file_type
-                assert result["filename"] == filename
+        # Run the uploads concurrently so their awaits interleave on the event loop
+        mock_files = [self.create_mock_upload_file(filename, content) for filename, _, content in files_data]
+        results = await asyncio.gather(*(
+            user_controller.upload_file(mock_file, file_type, test_user)
+            for mock_file, (_, file_type, _) in zip(mock_files, files_data)
+        ))
 
-            # Verify database was updated for each file
-            assert mock_user_service.update_user_files.call_count == 3
+        for result, (filename, file_type, _) in zip(results, files_data):
+            assert result["success"] == True
+            assert result["file_type"] == file_type
+            assert result["filename"] == filename
+
+        # Every upload got its own file path and database update
+        assert len({result["file_path"] for result in results}) == 3
+        assert mock_user_service.update_user_files.await_count == 3
 
     # ERROR HANDLING TESTS
-    @pytest.mark.asyncio
-    async def test_upload_file_system_error(self, user_controller, mock_user_service, test_user, mock_settings):
+    async def test_upload_file_system_error(self, user_controller, mock_user_service, test_user, mock_settings, controller_os):
         """Test upload handles file system errors"""
         pdf_content = b"%PDF-1.4\ntest content"
         mock_file = self.create_mock_upload_file("test.pdf", pdf_content)
+        controller_os.makedirs.side_effect = OSError("Permission denied")
 
-        with patch('pathlib.Path.mkdir', side_effect=OSError("Permission denied")):
-            
-            with pytest.raises(HTTPException) as exc_info:
-                await user_controller.upload_file(mock_file, "cv", test_user)
+        with pytest.raises(HTTPException, match="File upload failed") as exc_info:
+            await user_controller.upload_file(mock_file, "cv", test_user)
 
-            assert exc_info.value.status_code == 500
-            assert "File upload failed" in str(exc_info.value.detail)
+        assert exc_info.value.status_code == 500
 
-    @pytest.mark.asyncio
     async def test_upload_file_read_error(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload handles file read errors"""
         mock_file = Mock(spec=UploadFile)
         mock_file.filename = "test.pdf"
+        mock_file.content_type = "application/pdf"
+        mock_file.size = None
         mock_file.read = AsyncMock(side_effect=Exception("File read error"))
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="File upload failed") as exc_info:
             await user_controller.upload_file(mock_file, "cv", test_user)
 
         assert exc_info.value.status_code == 500
-        assert "File upload failed" in str(exc_info.value.detail)
 
     # INTEGRATION TESTS
     def test_upload_endpoint_requires_auth(self, api_client):
@@ -349,59 +437,60 @@ class TestFileUpload:
         assert response.status_code in [401, 422]
 
     # SECURITY TESTS
-    @pytest.mark.asyncio
-    async def test_upload_prevents_path_traversal(self, user_controller, mock_user_service, test_user, mock_settings):
+    async def test_upload_prevents_path_traversal(self, user_controller, mock_user_service, test_user, mock_settings, user_dir):
         """Test that upload prevents path traversal attacks"""
         pdf_content = b"%PDF-1.4\ntest content"
         # Try to use path traversal in filename
         mock_file = self.create_mock_upload_file("../../../etc/passwd.pdf", pdf_content)
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
+        mock_user_service.update_user_files.return_value = True
 
-            result = await user_controller.upload_file(mock_file, "cv", test_user)
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
 
-            # Verify the filename was sanitized (should not contain path traversal)
-            assert result["success"] == True
-            # The generated filename should be safe and not contain ../ 
-            assert "../" not in result["file_path"]
+        # Verify the filename was sanitized (should not contain path traversal)
+        assert result["success"] == True
+        # The generated filename should be safe and not contain ../ 
+        assert "../" not in result["file_path"]
+        assert Path(result["file_path"]).parent == user_dir
 
-    @pytest.mark.asyncio
-    async def test_upload_validates_file_extension_case_insensitive(self, user_controller, mock_user_service, test_user, mock_settings):
+    @pytest.mark.parametrize("filename", ["test.PDF", "test.Pdf", "test.pDf"])
+    async def test_upload_validates_file_extension_case_insensitive(self, filename, user_controller, mock_user_service, test_user, mock_settings):
         """Test that file extension validation is case insensitive"""
         pdf_content = b"%PDF-1.4\ntest content"
-        
-        # Test various case combinations
-        for filename in ["test.PDF", "test.Pdf", "test.pDf"]:
-            mock_file = self.create_mock_upload_file(filename, pdf_content)
+        mock_file = self.create_mock_upload_file(filename, pdf_content)
 
-            with patch('builtins.open', mock_open()) as mock_file_open, \
-                 patch('pathlib.Path.mkdir') as mock_mkdir, \
-                 patch('pathlib.Path.exists', return_value=False):
-                
-                mock_user_service.update_user_files.return_value = True
+        mock_user_service.update_user_files.return_value = True
 
-                result = await user_controller.upload_file(mock_file, "cv", test_user)
-                assert result["success"] == True
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
+        assert result["success"] == True
 
     # PERFORMANCE TESTS
-    @pytest.mark.asyncio
     async def test_upload_large_valid_file(self, user_controller, mock_user_service, test_user, mock_settings):
         """Test upload of large but valid file (just under limit)"""
         # Create file just under the 10MB limit
-        large_content = b"x" * (9 * 1024 * 1024)  # 9MB
-        mock_file = self.create_mock_upload_file("large_valid.pdf", large_content)
+        large_size = 9 * 1024 * 1024  # 9MB
+        mock_file = self.create_mock_upload_file("large_valid.pdf", b"", size=large_size)
 
-        with patch('builtins.open', mock_open()) as mock_file_open, \
-             patch('pathlib.Path.mkdir') as mock_mkdir, \
-             patch('pathlib.Path.exists', return_value=False):
-            
-            mock_user_service.update_user_files.return_value = True
+        mock_user_service.update_user_files.return_value = True
 
+        result = await user_controller.upload_file(mock_file, "cv", test_user)
+
+        assert result["success"] == True
+        assert result["file_size"] == large_size
+
+    async def test_upload_streams_without_buffering_whole_file(self, user_controller, mock_user_service, test_user, mock_settings):
+        """Test that upload memory stays bounded by the chunk size, not the file size"""
+        large_size = 9 * 1024 * 1024  # 9MB
+        mock_file = self.create_mock_upload_file("large_valid.pdf", b"", size=large_size)
+
+        mock_user_service.update_user_files.return_value = True
+
+        tracemalloc.start()
+        try:
             result = await user_controller.upload_file(mock_file, "cv", test_user)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
 
-            assert result["success"] == True
-            assert result["file_size"] == 9 * 1024 * 1024
\ No newline at end of file
+        assert result["file_size"] == large_size
+        assert peak < 3 * _UPLOAD_CHUNK_SIZE, f"Peak allocation {peak} bytes suggests the file was buffered"
\ No newline at end of file
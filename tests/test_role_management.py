@@ -5,32 +5,83 @@ from fastapi import HTTPException
 from datetime import datetime, timezone
 
 from app.controllers.user_controller import UserController
-from app.services.user_service import UserService
 from app.models.user import User, UserCreate
 from app.models.enums import UserRole
+from app.core.dependencies import require_admin, require_company, require_company_or_admin
+
+# Fixed reference time shared by every test in the module
+NOW = datetime.now(timezone.utc)
+
+# (dependency, role it accepts, role it rejects, rejection detail)
+ROLE_CASES = [
+    (require_admin, UserRole.ADMIN, UserRole.STUDENT, "Admin privileges required"),
+    (require_company, UserRole.COMPANY, UserRole.ADMIN, "Company account required"),
+]
+
+# Request bodies for update_profile, encoded once at import
+_BODY_EMPRESA_NEW_COMPANY = json.dumps({
+    "role": "empresa",
+    "company_name": "New Company",
+    "company_document": "98765432-1"
+}).encode()
+_BODY_ESTUDIANTE_GITHUB = json.dumps({
+    "role": "estudiante",
+    "github_url": "https://github.com/testuser",
+    "skills": ["Python", "JavaScript"]
+}).encode()
+_BODY_INVALID_ROLE = json.dumps({"role": "invalid_role"}).encode()
+_BODY_EMPRESA_BIO = json.dumps({"role": "empresa", "bio": "Updated bio"}).encode()
+_BODY_EMPRESA_FULL_PROFILE = json.dumps({
+    "role": "empresa",
+    "company_name": "Test Company Ltd",
+    "company_document": "12345678-9",
+    "bio": "We are a tech company"
+}).encode()
+_ROLE_BODIES = {role.value: json.dumps({"role": role.value}).encode() for role in UserRole}
+
+# UserRole members by their string value, for parametrized role names
+_ROLE_BY_STR = {role.value: role for role in UserRole}
+
+# (endpoint, method, accepted statuses) without credentials:
+# student endpoints are public (200) or need auth (401); company and admin
+# endpoints need auth (401) or the role (403), admin routes may also 404
+ENDPOINT_CASES = (
+    ("/api/courses", "GET", {200, 401}),
+    ("/api/events", "GET", {200, 401}),
+    ("/api/jobs", "GET", {200, 401}),
+    ("/api/saved-items", "GET", {200, 401}),
+    ("/api/jobs", "POST", {401, 403}),
+    ("/api/company/applications", "GET", {401, 403}),
+    ("/api/admin/users", "GET", {401, 403, 404}),
+    ("/api/admin/users/test-id/role", "PUT", {401, 403, 404}),
+    ("/api/admin/users/test-id/status", "PUT", {401, 403, 404}),
+    ("/api/admin/create-admin", "POST", {401, 403, 404}),
+)
+
+
+def user_with_role(role: UserRole) -> User:
+    """Build an active, verified user holding the given role"""
+    return User(
+        id=f"{role.value}-123",
+        email=f"{role.value}@example.com",
+        name=f"{role.value.title()} User",
+        role=role,
+        is_active=True,
+        is_verified=True
+    )
 
 
 class TestRoleManagement:
     """Test suite for role management system"""
 
-    @pytest.fixture
-    def mock_user_service(self):
-        """Mock user service for testing"""
-        service = Mock(spec=UserService)
-        service.get_user_by_email = AsyncMock()
-        service.create_user = AsyncMock()
-        service.update_user = AsyncMock()
-        service.get_user_by_id = AsyncMock()
-        service.get_users_by_role = AsyncMock()
-        return service
-
     @pytest.fixture
     def user_controller(self, mock_user_service):
-        """Create user controller with mocked dependencies"""
+        """Create user controller backed by the conftest StubUserService"""
         return UserController(mock_user_service)
 
-    @pytest.fixture
-    def student_user(self):
+    @pytest.fixture(scope="module")
+    @classmethod
+    def student_user(cls):
         """Sample student user"""
         return User(
             id="student-123",
@@ -41,8 +92,9 @@ class TestRoleManagement:
             is_verified=True
         )
 
-    @pytest.fixture
-    def company_user(self):
+    @pytest.fixture(scope="module")
+    @classmethod
+    def company_user(cls):
         """Sample company user"""
         return User(
             id="company-123",
@@ -55,8 +107,9 @@ class TestRoleManagement:
             company_document="12345678-9"
         )
 
-    @pytest.fixture
-    def admin_user(self):
+    @pytest.fixture(scope="module")
+    @classmethod
+    def admin_user(cls):
         """Sample admin user"""
         return User(
             id="admin-123",
@@ -67,13 +120,38 @@ class TestRoleManagement:
             is_verified=True
         )
 
-    # ROLE ENUM TESTS
+    @pytest.fixture
+    def mock_require_auth(self):
+        """Patch require_auth so the role dependencies see the user the test sets"""
+        with patch('app.core.dependencies.require_auth') as mock_require_auth:
+            yield mock_require_auth
+
+    @pytest.fixture
+    def make_request(self):
+        """Factory for a mock request whose body() returns the given bytes"""
+        request = Mock()
+        request.body = AsyncMock()
+        def make(body: bytes) -> Mock:
+            request.body.return_value = body
+            return request
+        return make
+
+    @pytest.fixture
+    def updated_student(self, student_user):
+        """Factory for the user the service returns after updating student_user"""
+        def make(**changes) -> User:
+            return student_user.model_copy(update=changes)
+        return make
+
+    # ROLE ENUM TESTS (constant checks only, nothing worth tracing for coverage)
+    @pytest.mark.no_cover
     def test_user_role_enum_values(self):
         """Test that UserRole enum has correct values"""
         assert UserRole.ADMIN == "admin"
         assert UserRole.STUDENT == "estudiante"
         assert UserRole.COMPANY == "empresa"
 
+    @pytest.mark.no_cover
     def test_user_role_enum_completeness(self):
         """Test that all expected roles are present"""
         expected_roles = {"admin", "estudiante", "empresa"}
@@ -112,25 +190,17 @@ class TestRoleManagement:
         assert user_create.role is None
 
     # ROLE ASSIGNMENT TESTS
-    @pytest.mark.asyncio
-    async def test_update_profile_role_assignment_student_to_company(self, user_controller, mock_user_service, student_user):
+    async def test_update_profile_role_assignment_student_to_company(self, user_controller, mock_user_service, student_user, updated_student, make_request):
         """Test updating user role from student to company"""
         # Mock request with role change
-        mock_request = Mock()
-        profile_data = {
-            "role": "empresa",
-            "company_name": "New Company",
-            "company_document": "98765432-1"
-        }
-        mock_request.body = AsyncMock(return_value=json.dumps(profile_data).encode())
+        mock_request = make_request(_BODY_EMPRESA_NEW_COMPANY)
 
         # Mock updated user
-        updated_user = User(**student_user.dict())
-        updated_user.role = UserRole.COMPANY
-        updated_user.company_name = "New Company"
-        updated_user.company_document = "98765432-1"
-        
-        mock_user_service.update_user.return_value = updated_user
+        mock_user_service.update_user.return_value = updated_student(
+            role=UserRole.COMPANY,
+            company_name="New Company",
+            company_document="98765432-1"
+        )
 
         result = await user_controller.update_profile(mock_request, student_user)
 
@@ -138,60 +208,39 @@ class TestRoleManagement:
         assert result.company_name == "New Company"
         mock_user_service.update_user.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_update_profile_role_assignment_company_to_student(self, user_controller, mock_user_service, company_user):
+    async def test_update_profile_role_assignment_company_to_student(self, user_controller, mock_user_service, company_user, make_request):
         """Test updating user role from company to student"""
-        mock_request = Mock()
-        profile_data = {
-            "role": "estudiante",
-            "github_url": "https://github.com/testuser",
-            "skills": ["Python", "JavaScript"]
-        }
-        mock_request.body = AsyncMock(return_value=json.dumps(profile_data).encode())
-
-        updated_user = User(**company_user.dict())
-        updated_user.role = UserRole.STUDENT
-        updated_user.github_url = "https://github.com/testuser"
-        
-        mock_user_service.update_user.return_value = updated_user
+        mock_request = make_request(_BODY_ESTUDIANTE_GITHUB)
+
+        mock_user_service.update_user.return_value = company_user.model_copy(update={
+            "role": UserRole.STUDENT,
+            "github_url": "https://github.com/testuser"
+        })
 
         result = await user_controller.update_profile(mock_request, company_user)
 
         assert result.role == UserRole.STUDENT
         mock_user_service.update_user.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_update_profile_invalid_role(self, user_controller, mock_user_service, student_user):
+    async def test_update_profile_invalid_role(self, user_controller, mock_user_service, student_user, make_request):
         """Test updating user with invalid role fails"""
-        mock_request = Mock()
-        profile_data = {
-            "role": "invalid_role"
-        }
-        mock_request.body = AsyncMock(return_value=json.dumps(profile_data).encode())
+        mock_request = make_request(_BODY_INVALID_ROLE)
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="Invalid role") as exc_info:
             await user_controller.update_profile(mock_request, student_user)
 
         assert exc_info.value.status_code == 400
-        assert "Invalid role" in str(exc_info.value.detail)
 
-    @pytest.mark.asyncio
-    async def test_update_profile_role_validation(self, user_controller, mock_user_service, student_user):
-        """Test that role validation works correctly"""
-        mock_request = Mock()
-        
-        # Test with valid roles
-        for valid_role in ["admin", "estudiante", "empresa"]:
-            profile_data = {"role": valid_role}
-            mock_request.body = AsyncMock(return_value=json.dumps(profile_data).encode())
-            
-            updated_user = User(**student_user.dict())
-            updated_user.role = UserRole(valid_role)
-            mock_user_service.update_user.return_value = updated_user
-            
-            # Should not raise exception
-            result = await user_controller.update_profile(mock_request, student_user)
-            assert result.role.value == valid_role
+    @pytest.mark.parametrize("valid_role", ["admin", "estudiante", "empresa"])
+    async def test_update_profile_role_validation(self, valid_role, user_controller, mock_user_service, student_user, updated_student, make_request):
+        """Test that every valid role is accepted"""
+        mock_request = make_request(_ROLE_BODIES[valid_role])
+
+        mock_user_service.update_user.return_value = updated_student(role=_ROLE_BY_STR[valid_role])
+
+        # Should not raise exception
+        result = await user_controller.update_profile(mock_request, student_user)
+        assert result.role.value == valid_role
 
     # ADMIN ROLE TESTS
     def test_admin_role_creation(self):
@@ -207,174 +256,68 @@ class TestRoleManagement:
         assert admin.is_student() == False
 
     # AUTHORIZATION DEPENDENCY TESTS
-    @pytest.mark.asyncio
-    async def test_require_admin_with_admin_user(self, admin_user):
-        """Test require_admin dependency with admin user"""
-        from app.core.dependencies import require_admin
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = admin_user
-            
-            result = await require_admin(mock_request)
-            assert result == admin_user
-
-    @pytest.mark.asyncio
-    async def test_require_admin_with_non_admin_user(self, student_user):
-        """Test require_admin dependency fails with non-admin user"""
-        from app.core.dependencies import require_admin
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = student_user
-            
-            with pytest.raises(HTTPException) as exc_info:
-                await require_admin(mock_request)
-            
-            assert exc_info.value.status_code == 403
-            assert "Admin privileges required" in str(exc_info.value.detail)
-
-    @pytest.mark.asyncio
-    async def test_require_company_with_company_user(self, company_user):
-        """Test require_company dependency with company user"""
-        from app.core.dependencies import require_company
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = company_user
-            
-            result = await require_company(mock_request)
-            assert result == company_user
-
-    @pytest.mark.asyncio
-    async def test_require_company_with_admin_user(self, admin_user):
-        """Test require_company dependency fails with admin user (admin is not company)"""
-        from app.core.dependencies import require_company
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = admin_user
-            
-            with pytest.raises(HTTPException) as exc_info:
-                await require_company(mock_request)
-            
-            assert exc_info.value.status_code == 403
-
-    @pytest.mark.asyncio
-    async def test_require_company_or_admin_with_company(self, company_user):
+    @pytest.mark.parametrize("dependency,ok_role,bad_role,detail", ROLE_CASES)
+    async def test_role_dependency_accepts_role(self, dependency, ok_role, bad_role, detail, mock_require_auth):
+        """Test role dependencies return the user when it holds the required role"""
+        user = user_with_role(ok_role)
+        mock_require_auth.return_value = user
+
+        result = await dependency(Mock())
+        assert result == user
+
+    @pytest.mark.parametrize("dependency,ok_role,bad_role,detail", ROLE_CASES)
+    async def test_role_dependency_rejects_role(self, dependency, ok_role, bad_role, detail, mock_require_auth):
+        """Test role dependencies fail with 403 for users without the required role"""
+        mock_require_auth.return_value = user_with_role(bad_role)
+
+        with pytest.raises(HTTPException, match=detail) as exc_info:
+            await dependency(Mock())
+
+        assert exc_info.value.status_code == 403
+
+    async def test_require_company_or_admin_with_company(self, company_user, mock_require_auth):
         """Test require_company_or_admin dependency with company user"""
-        from app.core.dependencies import require_company_or_admin
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = company_user
-            
-            result = await require_company_or_admin(mock_request)
-            assert result == company_user
+        mock_require_auth.return_value = company_user
+
+        result = await require_company_or_admin(Mock())
+        assert result == company_user
 
-    @pytest.mark.asyncio
-    async def test_require_company_or_admin_with_admin(self, admin_user):
+    async def test_require_company_or_admin_with_admin(self, admin_user, mock_require_auth):
         """Test require_company_or_admin dependency with admin user"""
-        from app.core.dependencies import require_company_or_admin
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = admin_user
-            
-            result = await require_company_or_admin(mock_request)
-            assert result == admin_user
+        mock_require_auth.return_value = admin_user
+
+        result = await require_company_or_admin(Mock())
+        assert result == admin_user
 
-    @pytest.mark.asyncio
-    async def test_require_company_or_admin_with_student_fails(self, student_user):
+    async def test_require_company_or_admin_with_student_fails(self, student_user, mock_require_auth):
         """Test require_company_or_admin dependency fails with student user"""
-        from app.core.dependencies import require_company_or_admin
-        
-        mock_request = Mock()
-        
-        with patch('app.core.dependencies.require_auth') as mock_require_auth:
-            mock_require_auth.return_value = student_user
-            
-            with pytest.raises(HTTPException) as exc_info:
-                await require_company_or_admin(mock_request)
-            
-            assert exc_info.value.status_code == 403
+        mock_require_auth.return_value = student_user
+
+        with pytest.raises(HTTPException) as exc_info:
+            await require_company_or_admin(Mock())
+
+        assert exc_info.value.status_code == 403
 
     # ENDPOINT ACCESS CONTROL TESTS
-    def test_student_endpoints_accessible(self, api_client):
-        """Test that student-accessible endpoints exist"""
-        # These endpoints should be accessible to students (but require auth)
-        student_endpoints = [
-            "/api/courses",
-            "/api/events", 
-            "/api/jobs",
-            "/api/saved-items",  # Requires auth but students can access
-        ]
-        
-        for endpoint in student_endpoints:
-            response = api_client.get(endpoint)
-            # Should either be 200 (public) or 401 (requires auth, but accessible to students)
-            assert response.status_code in [200, 401], f"Student endpoint {endpoint} not accessible"
-
-    def test_company_only_endpoints_require_company_role(self, api_client):
-        """Test that company-only endpoints require company role"""
-        company_endpoints = [
-            ("/api/jobs", "POST"),  # Create job
-            ("/api/company/applications", "GET"),
-        ]
-        
-        for endpoint, method in company_endpoints:
-            if method == "GET":
-                response = api_client.get(endpoint)
-            elif method == "POST":
-                response = api_client.post(endpoint, json={})
-            
-            # Should require authentication (401) or company role (403)
-            assert response.status_code in [401, 403], f"Company endpoint {method} {endpoint} not properly protected"
-
-    def test_admin_only_endpoints_require_admin_role(self, api_client):
-        """Test that admin-only endpoints require admin role"""
-        admin_endpoints = [
-            ("/api/admin/users", "GET"),
-            ("/api/admin/users/test-id/role", "PUT"),
-            ("/api/admin/users/test-id/status", "PUT"),
-            ("/api/admin/create-admin", "POST"),
-        ]
-        
-        for endpoint, method in admin_endpoints:
-            if method == "GET":
-                response = api_client.get(endpoint)
-            elif method == "POST":
-                response = api_client.post(endpoint, json={})
-            elif method == "PUT":
-                response = api_client.put(endpoint, json={})
-            
-            # Should require authentication (401) or admin role (403/404)
-            assert response.status_code in [401, 403, 404], f"Admin endpoint {method} {endpoint} not properly protected"
+    @pytest.mark.integration
+    @pytest.mark.xdist_group("role_endpoints")
+    @pytest.mark.parametrize("endpoint,method,allowed", ENDPOINT_CASES)
+    def test_endpoint_access_control(self, endpoint, method, allowed, api_client):
+        """Test that endpoints are reachable or protected according to their role"""
+        response = api_client.request(method, endpoint, json=None if method == "GET" else {})
+        assert response.status_code in allowed, f"Endpoint {method} {endpoint} returned {response.status_code}"
 
     # ROLE PERSISTENCE TESTS
-    @pytest.mark.asyncio
-    async def test_role_persists_after_update(self, user_controller, mock_user_service, student_user):
+    async def test_role_persists_after_update(self, user_controller, mock_user_service, student_user, updated_student, make_request):
         """Test that role persists correctly after profile update"""
-        mock_request = Mock()
-        profile_data = {
-            "role": "empresa",
-            "bio": "Updated bio"
-        }
-        mock_request.body = AsyncMock(return_value=json.dumps(profile_data).encode())
+        mock_request = make_request(_BODY_EMPRESA_BIO)
 
         # Mock the updated user with the new role
-        updated_user = User(**student_user.dict())
-        updated_user.role = UserRole.COMPANY
-        updated_user.bio = "Updated bio"
-        updated_user.updated_at = datetime.now(timezone.utc)
-        
-        mock_user_service.update_user.return_value = updated_user
+        mock_user_service.update_user.return_value = updated_student(
+            role=UserRole.COMPANY,
+            bio="Updated bio",
+            updated_at=NOW
+        )
 
         result = await user_controller.update_profile(mock_request, student_user)
 
@@ -390,32 +333,26 @@ class TestRoleManagement:
         assert 'updated_at' in update_data
 
     # ERROR HANDLING TESTS
-    @pytest.mark.asyncio
-    async def test_role_update_with_empty_body(self, user_controller, mock_user_service, student_user):
+    async def test_role_update_with_empty_body(self, user_controller, mock_user_service, student_user, make_request):
         """Test role update with empty request body"""
-        mock_request = Mock()
-        mock_request.body = AsyncMock(return_value=b'')
+        mock_request = make_request(b'')
 
         with pytest.raises(HTTPException) as exc_info:
             await user_controller.update_profile(mock_request, student_user)
 
         assert exc_info.value.status_code == 400
 
-    @pytest.mark.asyncio
-    async def test_role_update_with_invalid_json(self, user_controller, mock_user_service, student_user):
+    async def test_role_update_with_invalid_json(self, user_controller, mock_user_service, student_user, make_request):
         """Test role update with invalid JSON"""
-        mock_request = Mock()
-        mock_request.body = AsyncMock(return_value=b'invalid json{')
+        mock_request = make_request(b'invalid json{')
 
-        with pytest.raises(HTTPException) as exc_info:
+        with pytest.raises(HTTPException, match="Invalid JSON") as exc_info:
             await user_controller.update_profile(mock_request, student_user)
 
         assert exc_info.value.status_code == 400
-        assert "Invalid JSON" in str(exc_info.value.detail)
 
     # INTEGRATION TESTS
-    @pytest.mark.asyncio
-    async def test_complete_role_change_workflow(self, user_controller, mock_user_service):
+    async def test_complete_role_change_workflow(self, user_controller, mock_user_service, make_request):
         """Test complete workflow of changing user from student to company"""
         # Start with a student user
         student = User(
@@ -427,14 +364,7 @@ class TestRoleManagement:
         )
 
         # Mock the profile update request
-        mock_request = Mock()
-        profile_data = {
-            "role": "empresa",
-            "company_name": "Test Company Ltd",
-            "company_document": "12345678-9",
-            "bio": "We are a tech company"
-        }
-        mock_request.body = AsyncMock(return_value=json.dumps(profile_data).encode())
+        mock_request = make_request(_BODY_EMPRESA_FULL_PROFILE)
 
         # Mock the updated user from the service
         updated_user = User(
@@ -446,7 +376,7 @@ class TestRoleManagement:
             company_document="12345678-9",
             bio="We are a tech company",
             is_active=True,
-            updated_at=datetime.now(timezone.utc)
+            updated_at=NOW
         )
         mock_user_service.update_user.return_value = updated_user
 
@@ -462,9 +392,8 @@ class TestRoleManagement:
         assert result.bio == "We are a tech company"
         
         # Verify the service was called correctly
-        mock_user_service.update_user.assert_called_once()
-        call_args = mock_user_service.update_user.call_args[0]
-        assert call_args[0] == student.id
-        update_data = call_args[1]
+        assert mock_user_service.update_user.call_count == 1
+        user_id, update_data = mock_user_service.update_user.call_args[0]
+        assert user_id == student.id
         assert update_data['role'] == "empresa"
         assert update_data['company_name'] == "Test Company Ltd"
\ No newline at end of file
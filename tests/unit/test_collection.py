@@ -0,0 +1,41 @@
+"""
+Tests for the collection hook in tests/conftest.py
+"""
+
+import pytest
+from unittest.mock import Mock
+
+from tests.conftest import pytest_collection_modifyitems
+
+
+class CollectedItem:
+    """Just enough of a pytest item for pytest_collection_modifyitems"""
+
+    def __init__(self, *fixturenames):
+        self.fixturenames = list(fixturenames)
+        self.markers = [pytest.mark.offline.mark]
+
+    def add_marker(self, marker):
+        self.markers.append(getattr(marker, "mark", marker))
+
+    def get_closest_marker(self, name):
+        return next((mark for mark in self.markers if mark.name == name), None)
+
+
+@pytest.mark.parametrize("offline,fixturenames,integration", [
+    (False, ("all_courses",), True),
+    (False, ("normalized_events", "all_events"), True),
+    (False, ("api_get", "api_client"), True),
+    (False, ("request",), False),
+    (True, ("all_jobs",), False),
+    (True, ("api_client",), True),
+], ids=["list", "derived-list", "api-get", "no-api", "list-offline", "client-offline"])
+def test_live_api_tests_are_marked_integration(offline, fixturenames, integration):
+    """Test that collection marks every test reaching the live API as integration"""
+    config = Mock()
+    config.getoption.return_value = offline
+    item = CollectedItem(*fixturenames)
+
+    pytest_collection_modifyitems(config, [item])
+
+    assert (item.get_closest_marker("integration") is not None) == integration